@@ -0,0 +1,314 @@
+# alerts.py
+"""
+Debounced, deduplicated moisture alerts
+
+AlertEngine keeps the alert level of every device and only emits an event
+when the level changes. A reading must cross a threshold by a hysteresis
+margin (in either direction) to count as a new level, and the new level must
+hold for a debounce window before it is reported. While a reading stays
+inside the current level's widened band the frame is skipped without
+evaluating anything.
+
+Events are handed to an AlertDispatcher, which batches them on a background
+thread and delivers them to a pluggable notifier with retries.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Ordered from most to least severe
+ALERT_LEVELS = ("critical", "irrigate", "recommended", "ok")
+_SEVERITY = {level: i for i, level in enumerate(ALERT_LEVELS)}
+
+DEFAULT_THRESHOLDS = {
+    "critical": 20.0,
+    "irrigate": 30.0,
+    # Soil types that still want irrigation below this moisture
+    "recommended": {"Sandy": 50.0, "Silty": 50.0, "Clayey": 60.0},
+}
+DEFAULT_HYSTERESIS = 2.0     # % moisture past a threshold needed to cross it
+DEFAULT_DEBOUNCE_S = 60.0    # A new level must hold this long before it is reported
+
+
+def classify_moisture(soil_type: str, moisture: float,
+                      thresholds: Dict[str, Any] = DEFAULT_THRESHOLDS) -> str:
+    """Classify moisture as critical, irrigate, recommended or ok"""
+    if moisture < thresholds["critical"]:
+        return "critical"
+    if moisture < thresholds["irrigate"]:
+        return "irrigate"
+    recommended = thresholds["recommended"].get(soil_type)
+    if recommended is not None and moisture < recommended:
+        return "recommended"
+    return "ok"
+
+
+def level_band(level: str, soil_type: str, thresholds: Dict[str, Any]) -> Tuple[float, float]:
+    """Moisture range [low, high) that classifies as level"""
+    recommended = thresholds["recommended"].get(soil_type)
+    ok_from = max(thresholds["irrigate"], recommended or 0.0)
+    bands = {
+        "critical": (float("-inf"), thresholds["critical"]),
+        "irrigate": (thresholds["critical"], thresholds["irrigate"]),
+        "recommended": (thresholds["irrigate"], ok_from),
+        "ok": (ok_from, float("inf")),
+    }
+    return bands[level]
+
+
+class _DeviceAlertState:
+    __slots__ = ("level", "soil_type", "band", "pending", "pending_since")
+
+    def __init__(self, level: str, soil_type: str, band: Tuple[float, float]):
+        self.level = level
+        self.soil_type = soil_type
+        self.band = band
+        self.pending: Optional[str] = None
+        self.pending_since = 0.0
+
+
+class AlertEngine:
+    """Track per-device alert levels and emit state changes only"""
+
+    def __init__(self, dispatcher: Optional["AlertDispatcher"] = None,
+                 hysteresis: float = DEFAULT_HYSTERESIS,
+                 debounce_s: float = DEFAULT_DEBOUNCE_S):
+        self.dispatcher = dispatcher
+        self.hysteresis = hysteresis
+        self.debounce_s = debounce_s
+        self._states: Dict[str, _DeviceAlertState] = {}
+        self._thresholds: Dict[str, Dict[str, Any]] = {}
+        self.evaluations = 0
+        self.skipped = 0
+        self.events_emitted = 0
+
+    def thresholds_for(self, device_id: Optional[str]) -> Dict[str, Any]:
+        """Thresholds for a device, falling back to the defaults"""
+        return self._thresholds.get(device_id, DEFAULT_THRESHOLDS)
+
+    def set_thresholds(self, device_id: str, thresholds: Dict[str, Any]):
+        """Override thresholds for one device; recommended thresholds merge per soil type"""
+        merged = dict(DEFAULT_THRESHOLDS)
+        merged.update(thresholds)
+        merged["recommended"] = {**DEFAULT_THRESHOLDS["recommended"], **thresholds.get("recommended", {})}
+        self._thresholds[device_id] = merged
+        # Force a full evaluation on the next frame
+        state = self._states.get(device_id)
+        if state:
+            state.band = (float("inf"), float("-inf"))
+
+    def _stable_band(self, level: str, soil_type: str, thresholds: Dict[str, Any]) -> Tuple[float, float]:
+        """Range in which a device at level stays there, widened by hysteresis on both sides"""
+        low, high = level_band(level, soil_type, thresholds)
+        return low - self.hysteresis, high + self.hysteresis
+
+    def update(self, device_id: str, soil_type: str, moisture: float,
+               now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Feed one reading; return the emitted event if the level changed"""
+        state = self._states.get(device_id)
+        if (state is not None and state.pending is None and state.soil_type == soil_type
+                and state.band[0] <= moisture < state.band[1]):
+            self.skipped += 1
+            return None
+
+        self.evaluations += 1
+        now = time.time() if now is None else now
+        thresholds = self.thresholds_for(device_id)
+        level = classify_moisture(soil_type, moisture, thresholds)
+
+        if state is None:
+            state = _DeviceAlertState(level, soil_type, self._stable_band(level, soil_type, thresholds))
+            self._states[device_id] = state
+            if level == "ok":
+                return None
+            return self._emit(device_id, None, level, soil_type, moisture, now)
+
+        # The reading must cross the threshold by the hysteresis margin
+        if _SEVERITY[level] > _SEVERITY[state.level]:
+            relaxed = classify_moisture(soil_type, moisture - self.hysteresis, thresholds)
+            level = relaxed if _SEVERITY[relaxed] > _SEVERITY[state.level] else state.level
+        elif _SEVERITY[level] < _SEVERITY[state.level]:
+            relaxed = classify_moisture(soil_type, moisture + self.hysteresis, thresholds)
+            level = relaxed if _SEVERITY[relaxed] < _SEVERITY[state.level] else state.level
+
+        state.soil_type = soil_type
+        if level == state.level:
+            state.pending = None
+            state.band = self._stable_band(level, soil_type, thresholds)
+            return None
+
+        if state.pending != level:
+            state.pending = level
+            state.pending_since = now
+        if now - state.pending_since < self.debounce_s:
+            return None
+
+        previous = state.level
+        state.level = level
+        state.pending = None
+        state.band = self._stable_band(level, soil_type, thresholds)
+        return self._emit(device_id, previous, level, soil_type, moisture, now)
+
+    def _emit(self, device_id: str, previous: Optional[str], level: str,
+              soil_type: str, moisture: float, now: float) -> Dict[str, Any]:
+        event = {
+            "device_id": device_id,
+            "level": level,
+            "previous": previous,
+            "soil_type": soil_type,
+            "moisture": moisture,
+            "timestamp": datetime.fromtimestamp(now).isoformat(),
+        }
+        self.events_emitted += 1
+        if self.dispatcher:
+            self.dispatcher.submit(event)
+        return event
+
+    def level_of(self, device_id: str) -> Optional[str]:
+        """Last reported alert level for a device"""
+        state = self._states.get(device_id)
+        return state.level if state else None
+
+
+class Notifier(ABC):
+    """Delivers a batch of alert events; raise to have the batch retried"""
+
+    @abstractmethod
+    def send(self, events: List[Dict[str, Any]]):
+        """Deliver one batch of events"""
+
+
+class FileNotifier(Notifier):
+    """Append events to a JSON lines file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def send(self, events: List[Dict[str, Any]]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+
+class WebhookNotifier(Notifier):
+    """POST each batch as a JSON array to a webhook URL"""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, events: List[Dict[str, Any]]):
+        # Deferred: urllib.request pulls in http.client, ssl and email
+        import urllib.request
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(events).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class QueueNotifier(Notifier):
+    """Put each batch on a queue for in-process consumers"""
+
+    def __init__(self, target: Optional[queue.Queue] = None):
+        self.queue = target if target is not None else queue.Queue()
+
+    def send(self, events: List[Dict[str, Any]]):
+        self.queue.put(list(events))
+
+
+class AlertDispatcher:
+    """Batch events on a background thread and deliver them with retries"""
+
+    def __init__(self, notifier: Notifier, batch_size: int = 50, batch_interval_s: float = 2.0,
+                 max_retries: int = 5, retry_backoff_s: float = 1.0):
+        self.notifier = notifier
+        self.batch_size = batch_size
+        self.batch_interval_s = batch_interval_s
+        self.max_retries = max_retries
+        self.retry_backoff_s = retry_backoff_s
+        self.logger = logging.getLogger(__name__)
+        self.delivered = 0
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._closing = threading.Event()
+        self._submit_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="AlertDispatcher", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, event: Dict[str, Any]):
+        """Queue an event for delivery without blocking the caller"""
+        with self._submit_lock:
+            if not self._closing.is_set():
+                self._queue.put_nowait(event)
+                return
+        self.dropped += 1
+        self.logger.warning("Alert dispatcher is closed; dropped event for %s", event.get("device_id"))
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            event = self._queue.get()
+            if event is None:
+                break
+            batch = [event]
+            deadline = time.monotonic() + self.batch_interval_s
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    event = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if event is None:
+                    stopping = True
+                    break
+                batch.append(event)
+            self._deliver(batch)
+
+    def close(self, timeout: float = 30.0):
+        """Deliver everything queued so far and stop the dispatcher thread.
+
+        Once closing, each remaining batch gets one more attempt without
+        backoff, so shutdown is bounded by the notifier's own timeout.
+        """
+        with self._submit_lock:
+            if self._closing.is_set():
+                return
+            self._closing.set()
+            self._queue.put(None)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            self.logger.error("Alert dispatcher did not finish within %.0fs; about %d events undelivered",
+                              timeout, self._queue.qsize())
+
+    def _deliver(self, batch: List[Dict[str, Any]]):
+        attempts = 0
+        while attempts < self.max_retries:
+            try:
+                self.notifier.send(batch)
+                self.delivered += len(batch)
+                return
+            except Exception as e:
+                attempts += 1
+                self.logger.warning("Alert delivery attempt %d/%d failed: %s",
+                                    attempts, self.max_retries, e)
+            if attempts >= self.max_retries or self._closing.is_set():
+                break
+            # close() cuts the backoff short instead of waiting it out
+            if self._closing.wait(self.retry_backoff_s * (2 ** (attempts - 1))):
+                break
+        self.dropped += len(batch)
+        self.logger.error("Dropped %d alert events after %d attempts", len(batch), attempts)
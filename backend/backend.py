@@ -1,9 +1,17 @@
 # backend.py
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Query
 from pydantic import BaseModel
 from process import ZubaGSMProcessor
+from storage import DB_FILE
+from alerts import QueueNotifier
+import os
+import re
 import threading
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from fleet import ALERT_LEVELS, DEFAULT_STALE_AFTER_S
+from export import FORMATS, export_stream, parse_time, resolve_format
 
 
 
@@ -17,15 +25,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Instantiate processor
-processor = ZubaGSMProcessor(debug_mode=False)
-processor.load_ml_model()
+# Instantiate processor (the ML model is loaded by run() or on first prediction)
+# ZUBA_DB_FILE overrides the reading database. ZUBA_DRY_RUN=1 stores readings only
+# when ZUBA_DB_FILE is set and holds alerts in a local queue (profiling)
+db_file = os.environ.get("ZUBA_DB_FILE")
+if os.environ.get("ZUBA_DRY_RUN") == "1":
+    processor = ZubaGSMProcessor(debug_mode=False, db_path=db_file, alert_notifier=QueueNotifier())
+else:
+    processor = ZubaGSMProcessor(debug_mode=False, db_path=db_file or DB_FILE)
 
 # Background thread to run serial processing
 def run_processor():
     processor.run()
 
-threading.Thread(target=run_processor, daemon=True).start()
+# ZUBA_DISABLE_SERIAL=1 serves the API without touching serial ports (profiling)
+if os.environ.get("ZUBA_DISABLE_SERIAL") != "1":
+    threading.Thread(target=run_processor, daemon=True).start()
 
 # Pydantic models for clean API
 class UserPreferences(BaseModel):
@@ -67,6 +82,45 @@ def get_latest_data():
         }
         return mock_data
 
+@app.get("/fleet")
+def get_fleet(
+    alert: Optional[str] = Query(None, description=f"Only devices at this alert level ({', '.join(ALERT_LEVELS)})"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    stale_after: float = Query(DEFAULT_STALE_AFTER_S, gt=0, description="Seconds without data before a device is stale")
+):
+    """Return the current state of every device in one compact payload"""
+    try:
+        return processor.fleet.page(alert=alert, offset=offset, limit=limit, stale_after=stale_after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/export")
+def export_readings(
+    device_id: Optional[str] = None,
+    start: Optional[str] = Query(None, description="ISO 8601 (UTC unless an offset is given) or epoch seconds, inclusive"),
+    end: Optional[str] = Query(None, description="ISO 8601 (UTC unless an offset is given) or epoch seconds, exclusive"),
+    format: Optional[str] = Query(None, description=f"One of {', '.join(FORMATS)}; defaults to parquet, or csv without pyarrow"),
+    chunk_size: int = Query(5000, ge=100, le=100000)
+):
+    """Stream stored readings for a device and time range"""
+    if not processor.store:
+        raise HTTPException(status_code=404, detail="Reading storage is disabled")
+    try:
+        fmt = resolve_format(format)
+        chunks = processor.store.iter_chunks(device_id, parse_time(start), parse_time(end), chunk_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Device ids come from the wire; keep the header ASCII and unquoted
+    safe_device = re.sub(r"[^A-Za-z0-9._-]", "_", device_id or "all")
+    filename = f"zuba_{safe_device}.{fmt}"
+    return StreamingResponse(
+        export_stream(chunks, fmt),
+        media_type=FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @app.post("/preferences")
 def update_preferences(prefs: UserPreferences):
     """Update soil texture and color from API instead of CLI input"""
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Zuba Serial Capture - record and replay raw ESP32 serial traffic
+
+Recording writes every raw line read from the serial port together with a
+monotonic timestamp into a gzip-compressed capture file. Replaying feeds a
+capture back into ZubaGSMProcessor at real time (1x), N times faster, or
+as fast as possible, so ingest and inference can be profiled on real traces.
+
+Usage:
+    python capture.py replay capture.zcap.gz [--speed 10 | --max] [--quiet]
+"""
+
+import argparse
+import atexit
+import gzip
+import threading
+import time
+from typing import Iterator, Optional, Tuple
+
+CAPTURE_HEADER = "# zuba-capture v1"
+FLUSH_EVERY_LINES = 100
+FLUSH_INTERVAL_S = 5.0
+
+
+class SerialRecorder:
+    """Append raw serial lines with monotonic timestamps to a gzip capture"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+        self._file.write(CAPTURE_HEADER + "\n")
+        self._file.flush()
+        self._last_flush = self._start
+        self.lines_written = 0
+        # The processor usually runs on a daemon thread whose finally never runs
+        atexit.register(self.close)
+
+    def write(self, line: str):
+        """Record one raw line, timestamped relative to the recording start"""
+        offset = time.monotonic() - self._start
+        # Tabs and newlines never appear inside ESP32 lines, but keep the
+        # format unambiguous if they ever do
+        line = line.replace('\t', ' ').replace('\n', ' ')
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(f"{offset:.6f}\t{line}\n")
+            self.lines_written += 1
+            # Sync-flush so a crash loses at most the last few lines
+            now = offset + self._start
+            if (self.lines_written % FLUSH_EVERY_LINES == 0
+                    or now - self._last_flush >= FLUSH_INTERVAL_S):
+                self._file.flush()
+                self._last_flush = now
+
+    def close(self):
+        """Flush and close the capture file"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_capture(path: str) -> Iterator[Tuple[float, str]]:
+    """Yield (offset_seconds, line) pairs from a capture file.
+
+    A capture cut short by a crash ends at its last complete line.
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = f.readline().rstrip('\n')
+        if header != CAPTURE_HEADER:
+            raise ValueError(f"Not a Zuba capture file: {path}")
+        while True:
+            try:
+                raw = f.readline()
+            except (EOFError, gzip.BadGzipFile):
+                return
+            if not raw.endswith('\n'):
+                return
+            offset, sep, line = raw.rstrip('\n').partition('\t')
+            if not sep:
+                continue
+            yield float(offset), line
+
+
+def replay_capture(processor, path: str, speed: Optional[float] = 1.0,
+                   base_time: Optional[float] = None) -> dict:
+    """Feed a capture into a processor.
+
+    speed=1.0 replays in real time, speed=N replays N times faster and
+    speed=None (or <= 0) replays as fast as possible. Each frame is processed
+    at base_time plus its capture offset (base_time defaults to now), so the
+    results do not depend on the replay speed. Returns throughput stats.
+    """
+    max_speed = speed is None or speed <= 0
+    if base_time is None:
+        base_time = time.time()
+    lines = 0
+    processed = 0
+    start = time.monotonic()
+
+    for offset, line in read_capture(path):
+        if not max_speed:
+            delay = offset / speed - (time.monotonic() - start)
+            if delay > 0:
+                time.sleep(delay)
+        if processor.process_line(line, base_time + offset):
+            processed += 1
+        lines += 1
+
+    elapsed = time.monotonic() - start
+    return {
+        "lines": lines,
+        "frames_processed": processed,
+        "elapsed_s": elapsed,
+        "lines_per_s": lines / elapsed if elapsed > 0 else 0.0,
+        "frames_per_s": processed / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main():
+    """Command line entry point for replaying captures"""
+    parser = argparse.ArgumentParser(description="Zuba serial capture tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    replay = sub.add_parser("replay", help="Replay a capture into the processor")
+    replay.add_argument("path", help="Capture file (.zcap.gz)")
+    replay.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed multiplier (default: 1.0)")
+    replay.add_argument("--max", action="store_true",
+                        help="Replay as fast as possible")
+    replay.add_argument("--quiet", action="store_true",
+                        help="Do not print sensor readings to the terminal")
+    replay.add_argument("--base-time", type=float,
+                        help="Epoch seconds of the first frame (default: now)")
+    replay.add_argument("--persist", action="store_true",
+                        help="Store replayed readings and deliver alerts like the live backend")
+    args = parser.parse_args()
+
+    from alerts import QueueNotifier
+    from process import ZubaGSMProcessor
+    from storage import DB_FILE
+
+    if args.persist:
+        processor = ZubaGSMProcessor(debug_mode=False, db_path=DB_FILE)
+    else:
+        # Keep replays out of the reading database and away from real notifiers
+        processor = ZubaGSMProcessor(debug_mode=False, db_path=None, alert_notifier=QueueNotifier())
+    processor.show_output = not args.quiet
+    processor.load_ml_model()
+
+    stats = replay_capture(processor, args.path, None if args.max else args.speed, args.base_time)
+    print("="*60)
+    print("REPLAY SUMMARY")
+    print("="*60)
+    print(f"Lines:       {stats['lines']}")
+    print(f"Frames:      {stats['frames_processed']}")
+    print(f"Elapsed:     {stats['elapsed_s']:.3f}s")
+    print(f"Throughput:  {stats['lines_per_s']:.1f} lines/s, {stats['frames_per_s']:.1f} frames/s")
+    print(f"Alerts:      {processor.alerts.events_emitted}")
+    print("="*60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Zuba Data Export - stream stored readings as Arrow IPC, Parquet or CSV
+
+Rows are read from the reading database in chunks and encoded chunk by
+chunk, so memory stays constant regardless of the exported time range.
+Arrow and Parquet need pyarrow; CSV works with the standard library only.
+
+Usage:
+    python export.py out.parquet [--device ESP32_SoilSense_01] [--start 2025-09-01] [--end 2025-10-01]
+"""
+
+import argparse
+import csv
+import io
+import math
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+
+from storage import COLUMNS, DB_FILE, iter_chunks
+
+FORMATS = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+    "csv": "text/csv",
+}
+EXTENSIONS = {".arrow": "arrow", ".arrows": "arrow", ".parquet": "parquet", ".csv": "csv"}
+
+
+def has_pyarrow() -> bool:
+    """Return True when pyarrow is installed"""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def resolve_format(fmt: Optional[str]) -> str:
+    """Validate a format name; None picks Parquet when pyarrow is available, else CSV"""
+    if fmt is None:
+        return "parquet" if has_pyarrow() else "csv"
+    fmt = fmt.lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt} (use {', '.join(FORMATS)})")
+    if fmt != "csv" and not has_pyarrow():
+        raise ValueError(f"{fmt} export requires pyarrow; install it or use format=csv")
+    return fmt
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """Parse an ISO 8601 date/time (UTC unless it has an offset) or epoch seconds into epoch seconds"""
+    if value is None or value == "":
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value)
+        # Exports are written in UTC, so naive bounds must be read in UTC too
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    if not math.isfinite(seconds):
+        raise ValueError(f"Time must be finite: {value}")
+    return seconds
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose contents are drained after every batch"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def _arrow_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("device_id", pa.string()),
+        ("timestamp", pa.timestamp("ms", tz="UTC")),
+        ("temperature", pa.float64()),
+        ("moisture", pa.float64()),
+        ("n_value", pa.float64()),
+        ("p_value", pa.float64()),
+        ("k_value", pa.float64()),
+        ("soil_type", pa.string()),
+    ])
+
+
+def _arrow_batch(rows: List[Tuple], schema):
+    import pyarrow as pa
+    columns = list(zip(*rows))
+    arrays = [
+        pa.array(columns[0], type=pa.string()),
+        pa.array([int(ts * 1000) for ts in columns[1]], type=pa.timestamp("ms", tz="UTC")),
+    ] + [pa.array(column, type=pa.float64()) for column in columns[2:7]] + [
+        pa.array(columns[7], type=pa.string()),
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _iter_arrow(chunks: Iterator[List[Tuple]]) -> Iterator[bytes]:
+    import pyarrow as pa
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, schema)
+    for rows in chunks:
+        writer.write_batch(_arrow_batch(rows, schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def _iter_parquet(chunks: Iterator[List[Tuple]]) -> Iterator[bytes]:
+    import pyarrow.parquet as pq
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    for rows in chunks:
+        # One row group per chunk keeps the writer's buffer bounded
+        writer.write_batch(_arrow_batch(rows, schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def _iter_csv(chunks: Iterator[List[Tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["device_id", "timestamp"] + list(COLUMNS[2:]))
+    for rows in chunks:
+        for row in rows:
+            writer.writerow([row[0], datetime.fromtimestamp(row[1], timezone.utc).isoformat()] + list(row[2:]))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    data = buffer.getvalue()
+    if data:
+        yield data.encode("utf-8")
+
+
+def export_stream(chunks: Iterator[List[Tuple]], fmt: str) -> Iterator[bytes]:
+    """Encode row chunks in an already-resolved format"""
+    if fmt == "arrow":
+        return _iter_arrow(chunks)
+    if fmt == "parquet":
+        return _iter_parquet(chunks)
+    return _iter_csv(chunks)
+
+
+def main():
+    """Command line entry point: export straight from the reading database"""
+    parser = argparse.ArgumentParser(description="Export stored Zuba readings")
+    parser.add_argument("output", help="Output file (.parquet, .arrow or .csv)")
+    parser.add_argument("--db", default=DB_FILE, help=f"Reading database (default: {DB_FILE})")
+    parser.add_argument("--device", help="Only export this device")
+    parser.add_argument("--start", help="Start time (ISO 8601, UTC unless an offset is given, or epoch seconds; inclusive)")
+    parser.add_argument("--end", help="End time (ISO 8601, UTC unless an offset is given, or epoch seconds; exclusive)")
+    parser.add_argument("--format", choices=list(FORMATS), help="Output format (default: from extension)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Rows per chunk")
+    args = parser.parse_args()
+
+    fmt = args.format
+    if fmt is None:
+        for extension, name in EXTENSIONS.items():
+            if args.output.lower().endswith(extension):
+                fmt = name
+                break
+    try:
+        fmt = resolve_format(fmt)
+    except ValueError as e:
+        parser.error(str(e))
+
+    chunks = iter_chunks(args.db, args.device, parse_time(args.start), parse_time(args.end), args.chunk_size)
+    written = 0
+    with open(args.output, "wb") as f:
+        for data in export_stream(chunks, fmt):
+            f.write(data)
+            written += len(data)
+    print(f"Exported {written} bytes of {fmt} to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+# features.py
+"""
+Streaming per-device feature engine
+
+Each device keeps a fixed-size ring buffer of recent readings in compact
+NumPy arrays plus a handful of running accumulators. Features are updated
+once per frame, so memory per device is constant and the cost of a frame
+does not depend on how long a device has been reporting.
+"""
+
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+# numpy is imported when the first device reports, not at module import
+if TYPE_CHECKING:
+    import numpy as np
+
+WINDOW_SIZE = 64            # Readings kept per device
+SERIES = ('moisture', 'temperature', 'n_value', 'p_value', 'k_value')
+
+GDD_BASE_TEMP = 10.0        # °C, common base for field crops
+MAX_GAP_S = 3600.0          # Gaps longer than this are not integrated
+WATERING_JUMP = 5.0         # Moisture rise (%) treated as a watering event
+MIN_DRYDOWN_S = 1800.0      # Drydown time needed before estimating drainage
+DRAINAGE_SMOOTHING = 0.2    # EMA weight for new drainage estimates
+DRAINAGE_FULL_SCALE = 2.0   # %/hour that maps to a drainage index of 1.0
+DEFAULT_DRAINAGE_INDEX = 0.5
+
+
+class DeviceFeatures:
+    """Ring-buffered readings and incremental features for one device"""
+
+    __slots__ = ('_times', '_values', '_next', '_count',
+                 'gdd', 'drainage_rate', '_peak_moisture', '_peak_time',
+                 '_last_time', '_last_temp', '_last_moisture', 'snapshot')
+
+    def __init__(self, window: int = WINDOW_SIZE):
+        import numpy as np
+        self._times = np.zeros(window, dtype=np.float64)
+        self._values = np.zeros((window, len(SERIES)), dtype=np.float32)
+        self._next = 0
+        self._count = 0
+        self.gdd = 0.0
+        self.drainage_rate: Optional[float] = None   # %/hour while drying
+        self._peak_moisture: Optional[float] = None
+        self._peak_time = 0.0
+        self._last_time: Optional[float] = None
+        self._last_temp = 0.0
+        self._last_moisture = 0.0
+        self.snapshot: Dict[str, Any] = {}
+
+    def update(self, reading: Dict[str, Any], now: float) -> Dict[str, Any]:
+        """Add one reading and refresh the derived features"""
+        row = [float(reading.get(name, 0) or 0) for name in SERIES]
+        moisture, temperature = row[0], row[1]
+
+        window = len(self._times)
+        self._times[self._next] = now
+        self._values[self._next] = row
+        self._next = (self._next + 1) % window
+        self._count = min(self._count + 1, window)
+
+        if self._last_time is not None:
+            dt = now - self._last_time
+            if 0 < dt <= MAX_GAP_S:
+                mean_temp = (self._last_temp + temperature) / 2
+                self.gdd += max(0.0, mean_temp - GDD_BASE_TEMP) * dt / 86400.0
+        self._update_drainage(moisture, now)
+
+        self._last_time = now
+        self._last_temp = temperature
+        self._last_moisture = moisture
+
+        slopes = self._slopes_per_hour()
+        self.snapshot = {
+            "samples": self._count,
+            "moisture_slope": round(float(slopes[0]), 3),
+            "n_trend": round(float(slopes[2]), 3),
+            "p_trend": round(float(slopes[3]), 3),
+            "k_trend": round(float(slopes[4]), 3),
+            "drainage_rate": None if self.drainage_rate is None else round(self.drainage_rate, 3),
+            "drainage_index": round(self.drainage_index(), 3),
+            "growing_degree_days": round(self.gdd, 3),
+        }
+        return self.snapshot
+
+    def _update_drainage(self, moisture: float, now: float):
+        """Estimate how fast moisture falls after the last watering peak"""
+        if (self._peak_moisture is None
+                or moisture >= self._peak_moisture
+                or moisture - self._last_moisture >= WATERING_JUMP):
+            self._peak_moisture = moisture
+            self._peak_time = now
+            return
+
+        elapsed = now - self._peak_time
+        if elapsed < MIN_DRYDOWN_S:
+            return
+        rate = (self._peak_moisture - moisture) / (elapsed / 3600.0)
+        if self.drainage_rate is None:
+            self.drainage_rate = rate
+        else:
+            self.drainage_rate += DRAINAGE_SMOOTHING * (rate - self.drainage_rate)
+
+    def _slopes_per_hour(self) -> 'np.ndarray':
+        """Least-squares slope of every series over the window, per hour"""
+        import numpy as np
+        if self._count < 2:
+            return np.zeros(len(SERIES))
+        times = self._times[:self._count]
+        values = self._values[:self._count]
+        t = (times - times.mean()) / 3600.0
+        denom = float(np.dot(t, t))
+        if denom == 0:
+            return np.zeros(len(SERIES))
+        return t @ (values - values.mean(axis=0)) / denom
+
+    def drainage_index(self) -> float:
+        """Drainage rate scaled to the 0-1 range the soil model expects"""
+        if self.drainage_rate is None:
+            return DEFAULT_DRAINAGE_INDEX
+        return min(max(self.drainage_rate / DRAINAGE_FULL_SCALE, 0.0), 1.0)
+
+
+class FeatureEngine:
+    """Keep DeviceFeatures for every device seen on the wire"""
+
+    def __init__(self, window: int = WINDOW_SIZE):
+        self.window = window
+        self._devices: Dict[str, DeviceFeatures] = {}
+        self._lock = threading.Lock()
+
+    def update(self, device_id: str, reading: Dict[str, Any],
+               now: Optional[float] = None) -> Dict[str, Any]:
+        """Feed one validated reading and return the device's features"""
+        device = self._devices.get(device_id)
+        if device is None:
+            with self._lock:
+                device = self._devices.setdefault(device_id, DeviceFeatures(self.window))
+        return device.update(reading, time.time() if now is None else now)
+
+    def get(self, device_id: str) -> Optional[DeviceFeatures]:
+        """Return the feature state for a device, if it has reported"""
+        return self._devices.get(device_id)
+
+    def __len__(self) -> int:
+        return len(self._devices)
@@ -0,0 +1,99 @@
+# fleet.py
+"""
+Incrementally maintained fleet overview
+
+Every processed frame updates one compact row per device and keeps a
+sorted device index per alert level, so the /fleet endpoint only slices
+prebuilt lists instead of scanning every device on each request.
+"""
+
+import bisect
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from alerts import ALERT_LEVELS
+
+DEFAULT_STALE_AFTER_S = 300.0
+
+
+class FleetState:
+    """Latest state of every device, indexed by alert level"""
+
+    def __init__(self):
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._all: List[str] = []
+        self._by_level: Dict[str, List[str]] = {level: [] for level in ALERT_LEVELS}
+        self._lock = threading.Lock()
+
+    def update(self, device_id: str, moisture: float, alert: str,
+               soil_type: Optional[str] = None, now: Optional[float] = None):
+        """Record the latest frame for a device"""
+        now = time.time() if now is None else now
+        row = {
+            "device_id": device_id,
+            "moisture": moisture,
+            "alert": alert,
+            "soil_type": soil_type,
+            "last_seen": datetime.fromtimestamp(now).isoformat(),
+            "_seen_at": now,
+        }
+        with self._lock:
+            previous = self._rows.get(device_id)
+            if previous is None:
+                bisect.insort(self._all, device_id)
+                bisect.insort(self._by_level[alert], device_id)
+            elif previous["alert"] != alert:
+                self._remove(self._by_level[previous["alert"]], device_id)
+                bisect.insort(self._by_level[alert], device_id)
+            self._rows[device_id] = row
+
+    @staticmethod
+    def _remove(index: List[str], device_id: str):
+        pos = bisect.bisect_left(index, device_id)
+        if pos < len(index) and index[pos] == device_id:
+            del index[pos]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of devices per alert level"""
+        return {level: len(ids) for level, ids in self._by_level.items()}
+
+    def page(self, alert: Optional[str] = None, offset: int = 0, limit: int = 100,
+             stale_after: float = DEFAULT_STALE_AFTER_S,
+             now: Optional[float] = None) -> Dict[str, Any]:
+        """Return one page of device rows, optionally for a single alert level"""
+        if alert is not None and alert not in self._by_level:
+            raise ValueError(f"Unknown alert level: {alert}")
+        now = time.time() if now is None else now
+
+        with self._lock:
+            index = self._all if alert is None else self._by_level[alert]
+            total = len(index)
+            ids = index[offset:offset + limit]
+            rows = [self._rows[device_id] for device_id in ids]
+            counts = self.counts()
+
+        devices = []
+        for row in rows:
+            age = max(0.0, now - row["_seen_at"])
+            devices.append({
+                "device_id": row["device_id"],
+                "moisture": row["moisture"],
+                "alert": row["alert"],
+                "soil_type": row["soil_type"],
+                "last_seen": row["last_seen"],
+                "age_s": round(age, 1),
+                "stale": age > stale_after,
+            })
+
+        return {
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "counts": counts,
+            "devices": devices,
+        }
+
+    def __len__(self) -> int:
+        return len(self._rows)
@@ -0,0 +1,207 @@
+# log_setup.py
+"""
+Asynchronous, structured logging for the Zuba processor
+
+Records are put on a bounded in-memory queue by a QueueHandler attached to
+the root logger and written by a QueueListener thread, so file and console
+I/O never happens on the serial ingest thread. The file output is one JSON
+object per line, rotated by size and by age. High-frequency messages can be
+sampled per message type before they are ever queued.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+LOG_FILE = "zuba_processor.log"
+LOG_MAX_BYTES = 5 * 1024 * 1024   # Rotate after 5 MB
+LOG_MAX_AGE_S = 24 * 60 * 60      # ...or after one day
+LOG_BACKUP_COUNT = 5
+LOG_QUEUE_SIZE = 10000
+
+# Keep 1 in N records for chatty per-frame messages (keyed by format string)
+DEFAULT_SAMPLE_RATES = {
+    "Raw JSON: %s": 10,
+    "Data processed successfully": 10,
+}
+
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "type": str(getattr(record, "msg_type", record.msg)),
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        # Anything passed through extra={...} becomes a top-level field
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and key not in entry and key != "msg_type":
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotate when the file exceeds max_bytes or is older than max_age seconds.
+
+    The file's creation time is kept in a "<log>.created" sidecar, since the
+    modification time moves forward with every write and across restarts.
+    """
+
+    def __init__(self, filename, max_bytes: int, max_age: float, backup_count: int):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count,
+                         encoding='utf-8', delay=True)
+        self.max_age = max_age
+        self._created_path = self.baseFilename + ".created"
+        self._created_at = self._read_created_at()
+
+    def _read_created_at(self) -> float:
+        try:
+            with open(self._created_path, encoding='utf-8') as f:
+                return float(f.read().strip())
+        except (OSError, ValueError):
+            return self._mark_created()
+
+    def _mark_created(self) -> float:
+        created_at = time.time()
+        try:
+            with open(self._created_path, 'w', encoding='utf-8') as f:
+                f.write(f"{created_at}\n")
+        except OSError:
+            pass
+        return created_at
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.max_age and time.time() - self._created_at >= self.max_age:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        self._created_at = self._mark_created()
+
+
+class SamplingFilter(logging.Filter):
+    """Pass only 1 in N records for configured message types.
+
+    Warnings and errors are never sampled.
+    """
+
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = dict(rates)
+        self._counts: Dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.msg) if isinstance(record.msg, str) else None
+        if not rate or rate <= 1:
+            return True
+        count = self._counts.get(record.msg, 0)
+        self._counts[record.msg] = count + 1
+        return count % rate == 0
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Like the base class, resolve the message and drop the unpicklable
+        # exc_info, but keep the format string (for grouping by message type)
+        # and the traceback text as separate fields instead of folding them
+        # into msg
+        record = copy.copy(record)
+        record.msg_type = record.msg
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(debug_mode: bool = False,
+                  log_file: str = LOG_FILE,
+                  sample_rates: Optional[Dict[str, int]] = None) -> logging.Logger:
+    """Install the queue-based logging pipeline once per process.
+
+    Calling it again only updates the log level, so re-instantiating the
+    processor never stacks duplicate handlers.
+    """
+    global _listener, _queue_handler
+
+    root = logging.getLogger()
+    root.setLevel(logging.DEBUG if debug_mode else logging.INFO)
+
+    with _setup_lock:
+        if _listener is not None:
+            return root
+
+        file_handler = SizeAndTimeRotatingFileHandler(
+            log_file, LOG_MAX_BYTES, LOG_MAX_AGE_S, LOG_BACKUP_COUNT)
+        file_handler.setFormatter(JsonFormatter())
+
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        _queue_handler = DroppingQueueHandler(log_queue)
+        rates = DEFAULT_SAMPLE_RATES if sample_rates is None else sample_rates
+        _queue_handler.addFilter(SamplingFilter(rates))
+        root.addHandler(_queue_handler)
+
+        _listener = logging.handlers.QueueListener(
+            log_queue, file_handler, console_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+    return root
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener, _queue_handler
+
+    with _setup_lock:
+        if _listener is None:
+            return
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+        _queue_handler = None
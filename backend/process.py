@@ -1,41 +1,60 @@
 # zuba_gsm_processor.py
-import serial
 import json
 import time
 import threading
 from datetime import datetime
-import joblib
-import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder
 import os
 import logging
-from typing import Dict, Any, Optional
+from typing import TYPE_CHECKING, Dict, Any, Optional
+from log_setup import setup_logging
+from features import FeatureEngine
+from fleet import FleetState
+from storage import DB_FILE, ReadingStore
+from alerts import AlertDispatcher, AlertEngine, FileNotifier, Notifier, WebhookNotifier, classify_moisture
 
+# pyserial, joblib, numpy and scikit-learn are imported where they are used
+# so that importing this module (e.g. for the API) stays cheap
+if TYPE_CHECKING:
+    import serial
+
+
+def build_dummy_model():
+    """Build a fallback model and label encoder that always predict Loamy"""
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import LabelEncoder
+
+    X_dummy = np.array([[28, 45, 6.5, 40, 25, 30, 0.8, 3]])
+    y_dummy = ['Loamy']
+    label_encoder = LabelEncoder()
+    y_encoded = label_encoder.fit_transform(y_dummy)
+    model = RandomForestClassifier(n_estimators=10, random_state=42)
+    model.fit(X_dummy, y_encoded)
+    return model, label_encoder
 
 
 class ZubaGSMProcessor:
-    def __init__(self, debug_mode=False):
+    def __init__(self, debug_mode=False, db_path: Optional[str] = DB_FILE,
+                 alert_notifier: Optional[Notifier] = None):
         self.model = None
         self.label_encoder = None
         self.debug_mode = debug_mode
         self.user_texture = "Loamy"  # Default values
         self.user_color = "Brown"    # Default values
+        self.show_output = True      # Print readings to the terminal
+        self.recorder = None         # Optional SerialRecorder for raw traffic
+        self.features = FeatureEngine()  # Per-device derived features
+        self.fleet = FleetState()        # Latest state of every device
+        self.store = ReadingStore(db_path) if db_path else None  # Reading history for export
+        self.alerts = AlertEngine(self.build_alert_dispatcher(alert_notifier))  # State-change alerts
+        self.default_device_id = "ESP32_SoilSense_01"
 
         # Configuration
         self.esp32_port = 'COM6'  # Your ESP32 port
         self.esp32_baud = 115200
         
-        # Setup logging
-        log_level = logging.DEBUG if debug_mode else logging.INFO
-        logging.basicConfig(
-            level=log_level,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler("zuba_processor.log", encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        # Setup logging (queue-based, installed once per process)
+        setup_logging(debug_mode)
         self.logger = logging.getLogger(__name__)
 
     def get_user_inputs(self):
@@ -84,26 +103,29 @@ class ZubaGSMProcessor:
     def load_ml_model(self):
         """Load ML model for soil prediction"""
         try:
+            import joblib
             self.model = joblib.load('hybrid_soil_crop_model.pkl')
             self.label_encoder = joblib.load('label_encoder.pkl')
             self.logger.info("ML Model loaded successfully")
         except Exception as e:
             self.logger.warning("Model load failed: %s. Using dummy model.", e)
             # Fallback dummy model
-            X_dummy = np.array([[28, 45, 6.5, 40, 25, 30, 0.8, 3]])
-            y_dummy = ['Loamy']
-            self.label_encoder = LabelEncoder()
-            y_encoded = self.label_encoder.fit_transform(y_dummy)
-            self.model = RandomForestClassifier(n_estimators=10, random_state=42)
-            self.model.fit(X_dummy, y_encoded)
-
-    def predict_soil_type(self, sensor_data: Dict[str, Any]) -> str:
-        """Predict soil type from sensor data using user texture"""
+            self.model, self.label_encoder = build_dummy_model()
+
+    def predict_soil_type(self, sensor_data: Dict[str, Any], device_id: Optional[str] = None) -> str:
+        """Predict soil type from sensor data using user texture and derived features"""
         try:
+            if self.model is None:
+                self.load_ml_model()
+
             # Map texture to numerical code
             texture_map = {"Sandy": 1, "Loamy": 3, "Clayey": 2, "Silty": 4, "Unknown": 3}
             texture_code = texture_map.get(self.user_texture, 3)
-            
+
+            # Drainage estimated from moisture drydown, placeholder until known
+            device = self.features.get(device_id or self.default_device_id)
+            drainage_rate = device.drainage_index() if device else 0.5
+
             features = [
                 sensor_data.get('temperature', 28.0),
                 sensor_data.get('moisture', 50.0),
@@ -111,18 +133,37 @@ class ZubaGSMProcessor:
                 sensor_data.get('n_value', 40),
                 sensor_data.get('p_value', 25),
                 sensor_data.get('k_value', 30),
-                0.5,  # drainage_rate placeholder
+                drainage_rate,
                 texture_code  # Use the texture code from user input
             ]
-            features_array = np.array(features).reshape(1, -1)
-            prediction_encoded = self.model.predict(features_array)
+            prediction_encoded = self.model.predict([features])
             return self.label_encoder.inverse_transform(prediction_encoded)[0]
         except Exception as e:
             self.logger.error("Prediction failed: %s", e)
             return self.user_texture  # Fallback to user input
 
-    def get_recommendation(self, soil_type: str, moisture: float) -> str:
-        """Generate agricultural recommendations based on soil type and moisture"""
+    def build_alert_dispatcher(self, notifier: Optional[Notifier] = None) -> AlertDispatcher:
+        """Deliver alerts to notifier, else ZUBA_ALERT_WEBHOOK if set, else a JSON lines file"""
+        if notifier is None:
+            webhook_url = os.environ.get("ZUBA_ALERT_WEBHOOK")
+            if webhook_url:
+                notifier = WebhookNotifier(webhook_url)
+            else:
+                notifier = FileNotifier(os.environ.get("ZUBA_ALERT_FILE", "zuba_alerts.jsonl"))
+        return AlertDispatcher(notifier)
+
+    def get_alert_level(self, soil_type: str, moisture: float, device_id: Optional[str] = None) -> str:
+        """Classify moisture as critical, irrigate, recommended or ok"""
+        return classify_moisture(soil_type, moisture, self.alerts.thresholds_for(device_id))
+
+    def get_recommendation(self, soil_type: str, moisture: float,
+                           features: Optional[Dict[str, Any]] = None,
+                           device_id: Optional[str] = None) -> str:
+        """Generate agricultural recommendations based on soil type and moisture.
+
+        For a device the alert engine already tracks, the debounced alert level
+        is used so the text agrees with /fleet and alert events.
+        """
         base_recommendations = {
             'Sandy': "Sunflower/Millet. Good drainage, needs frequent irrigation.",
             'Loamy': "Maize/Soybean. Balanced soil, moderate irrigation.",
@@ -144,17 +185,23 @@ class ZubaGSMProcessor:
         color_note = color_notes.get(self.user_color, "")
         
         # Moisture alert
-        moisture_alert = ""
-        if moisture < 20:
-            moisture_alert = " 🚨 CRITICAL - IRRIGATE IMMEDIATELY!"
-        elif moisture < 30:
-            moisture_alert = " 🚨 IRRIGATE NOW!"
-        elif moisture < 50 and soil_type in ['Sandy', 'Silty']:
-            moisture_alert = " 💧 Irrigation recommended."
-        elif moisture < 60 and soil_type in ['Clayey']:
-            moisture_alert = " 💧 Irrigation recommended."
-        
-        return f"{base} {color_note}{moisture_alert}"
+        alert_messages = {
+            'critical': " 🚨 CRITICAL - IRRIGATE IMMEDIATELY!",
+            'irrigate': " 🚨 IRRIGATE NOW!",
+            'recommended': " 💧 Irrigation recommended.",
+            'ok': ""
+        }
+        level = self.alerts.level_of(device_id) if device_id else None
+        moisture_alert = alert_messages[level or self.get_alert_level(soil_type, moisture, device_id)]
+
+        # Trend note from derived features
+        trend_note = ""
+        if features and features.get("samples", 0) >= 3:
+            slope = features.get("moisture_slope", 0)
+            if slope <= -1.0 and moisture < 60:
+                trend_note = f" Moisture falling {abs(slope):.1f}%/h."
+
+        return f"{base} {color_note}{moisture_alert}{trend_note}"
 
     def validate_sensor_data(self, data: Dict[str, Any]) -> bool:
         """Validate incoming sensor data from ESP32"""
@@ -174,19 +221,26 @@ class ZubaGSMProcessor:
             
         return True
 
-    def process_sensor_data(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Main processing pipeline"""
+    def process_sensor_data(self, raw_data: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+        """Main processing pipeline; now is the frame time (defaults to the wall clock)"""
         # Validate data first
         if not self.validate_sensor_data(raw_data):
             self.logger.warning("Invalid sensor data received")
             return None
 
-        # Predict soil type
-        soil_type = self.predict_soil_type(raw_data)
+        # Update derived features, then predict soil type
+        now = time.time() if now is None else now
+        device_id = str(raw_data.get('device_id') or self.default_device_id)
+        features = self.features.update(device_id, raw_data, now)
+        soil_type = self.predict_soil_type(raw_data, device_id)
+        moisture = raw_data.get('moisture', 0)
+        event = self.alerts.update(device_id, soil_type, moisture, now)
+        if event:
+            self.logger.info("Alert for %s: %s -> %s", device_id, event["previous"], event["level"])
 
         processed_data = {
-            "device_id": "ESP32_SoilSense_01",
-            "timestamp": datetime.now().isoformat(),
+            "device_id": device_id,
+            "timestamp": datetime.fromtimestamp(now).isoformat(),
             "soil_type": soil_type,
             "temperature": raw_data.get('temperature', 0),
             "moisture": raw_data.get('moisture', 0),
@@ -195,13 +249,19 @@ class ZubaGSMProcessor:
             "k_value": raw_data.get('k_value', 0),
             "user_texture": self.user_texture,
             "user_color": self.user_color,
-            "recommendation": self.get_recommendation(soil_type, raw_data.get('moisture', 0))
+            "features": features,
+            "recommendation": self.get_recommendation(soil_type, moisture, features, device_id)
         }
 
         self.last_sensor_read = processed_data
+        # The fleet view shows the same debounced level as alert events
+        self.fleet.update(device_id, moisture, self.alerts.level_of(device_id), soil_type, now)
+        if self.store:
+            self.store.add(processed_data, now)
 
         # Display in terminal
-        self.display_sensor_data(processed_data)
+        if self.show_output:
+            self.display_sensor_data(processed_data)
 
         return processed_data
 
@@ -220,8 +280,9 @@ class ZubaGSMProcessor:
         print(data['recommendation'])
         print("="*60 + "\n")
 
-    def setup_serial_connection(self, port: str, baudrate: int, max_retries: int = 3) -> Optional[serial.Serial]:
+    def setup_serial_connection(self, port: str, baudrate: int, max_retries: int = 3) -> Optional['serial.Serial']:
         """Establish serial connection with retry logic"""
+        import serial
         for attempt in range(max_retries):
             try:
                 ser = serial.Serial(port, baudrate, timeout=1)
@@ -233,33 +294,64 @@ class ZubaGSMProcessor:
                 time.sleep(2)
         return None
 
-    def process_serial_data(self, ser: serial.Serial):
+    def start_recording(self, path: str):
+        """Record raw serial lines to a compressed capture file"""
+        from capture import SerialRecorder
+        self.stop_recording()
+        self.recorder = SerialRecorder(path)
+        self.logger.info("Recording serial traffic to %s", path)
+
+    def stop_recording(self):
+        """Stop recording raw serial lines"""
+        if self.recorder:
+            self.recorder.close()
+            self.logger.info("Recorded %d lines to %s", self.recorder.lines_written, self.recorder.path)
+            self.recorder = None
+
+    def process_line(self, line: str, now: Optional[float] = None) -> bool:
+        """Process a single line received from the ESP32 at time now"""
+        line = line.strip()
+        if not line:
+            return False
+
+        try:
+            if line.startswith('{') and line.endswith('}'):
+                self.logger.debug("Raw JSON: %s", line)
+                sensor_data = json.loads(line)
+                result = self.process_sensor_data(sensor_data, now)
+                if result:
+                    self.logger.info("Data processed successfully")
+                    return True
+            else:
+                # Display non-JSON messages
+                if self.show_output:
+                    print(f"ESP32: {line}")
+
+        except json.JSONDecodeError as e:
+            self.logger.error("JSON decode error: %s", e)
+            self.logger.debug("Problematic data: %s", line)
+        except Exception as e:
+            self.logger.error("Processing error: %s", e)
+        return False
+
+    def process_serial_data(self, ser: 'serial.Serial'):
         """Process data from serial connection"""
         if ser and ser.in_waiting > 0:
             try:
                 line = ser.readline().decode('utf-8', errors='ignore').strip()
-                if not line:
-                    return
-                
-                if line.startswith('{') and line.endswith('}'):
-                    self.logger.debug("Raw JSON: %s", line)
-                    sensor_data = json.loads(line)
-                    result = self.process_sensor_data(sensor_data)
-                    if result:
-                        self.logger.info("Data processed successfully")
-                else:
-                    # Display non-JSON messages
-                    if line and not line.isspace():
-                        print(f"ESP32: {line}")
-                        
-            except json.JSONDecodeError as e:
-                self.logger.error("JSON decode error: %s", e)
-                self.logger.debug("Problematic data: %s", line)
             except Exception as e:
-                self.logger.error("Processing error: %s", e)
+                self.logger.error("Serial read error: %s", e)
+                return
+            if not line:
+                return
+
+            if self.recorder:
+                self.recorder.write(line)
+            self.process_line(line)
 
     def test_serial_connection(self):
         """Test the serial connection and report available ports"""
+        import serial
         self.logger.info("Testing serial connections...")
         
         if os.name == 'nt':  # Windows
@@ -314,6 +406,11 @@ class ZubaGSMProcessor:
             print("3. No other program is using the serial port")
             return
         
+        # Optional raw traffic capture for replay/profiling
+        capture_path = os.environ.get("ZUBA_CAPTURE_FILE")
+        if capture_path:
+            self.start_recording(capture_path)
+
         print("\n" + "="*60)
         print("Zuba SoilSense Processor - Ready!")
         print("Listening for sensor data from ESP32...")
@@ -329,19 +426,16 @@ class ZubaGSMProcessor:
         finally:
             if esp32_serial:
                 esp32_serial.close()
+            self.stop_recording()
             print("Serial connection closed")
 
 
 if __name__ == '__main__':
     # Create dummy model files if they don't exist
     if not os.path.exists('hybrid_soil_crop_model.pkl'):
+        import joblib
         print("Creating dummy model files...")
-        X_dummy = np.array([[28, 45, 6.5, 40, 25, 30, 0.8, 3]])
-        y_dummy = ['Loamy']
-        label_encoder = LabelEncoder()
-        y_encoded = label_encoder.fit_transform(y_dummy)
-        model = RandomForestClassifier(n_estimators=10, random_state=42)
-        model.fit(X_dummy, y_encoded)
+        model, label_encoder = build_dummy_model()
         joblib.dump(model, 'hybrid_soil_crop_model.pkl')
         joblib.dump(label_encoder, 'label_encoder.pkl')
         print("Dummy model files created!")
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Zuba Backend Profiling Harness
+Reports import-time breakdown, resident memory after startup and per-request
+allocations for each endpoint, and fails when a budget is exceeded.
+
+Usage:
+    python profile_backend.py [--max-import-ms 1500] [--max-rss-mb 150] [--max-request-kb 256] [--max-export-kb 512]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that must not be imported just to serve the API
+DEFERRED_MODULES = ["serial", "joblib", "sklearn", "numpy"]
+
+EXPORT_ENDPOINT = "/export?format=csv&chunk_size=100"
+ENDPOINTS = ["/health", "/latest", "/recommendation", "/fleet", EXPORT_ENDPOINT]
+REQUESTS_PER_ENDPOINT = 50
+# Several times the chunk size, so the export peak shows one chunk rather than the whole range
+EXPORT_ROWS = 2000
+
+
+def child_env(db_path=None):
+    """Environment for child processes: no serial thread, no persistence beyond db_path, backend on the path"""
+    env = dict(os.environ)
+    env["ZUBA_DISABLE_SERIAL"] = "1"
+    env["ZUBA_DRY_RUN"] = "1"
+    if db_path:
+        env["ZUBA_DB_FILE"] = db_path
+    else:
+        env.pop("ZUBA_DB_FILE", None)
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def import_time_breakdown(top: int = 15):
+    """Run `python -X importtime -c "import backend"` and total self time per top-level package"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend"],
+        cwd=BACKEND_DIR, env=child_env(), capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing backend failed:\n{result.stderr[-2000:]}")
+
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        # Summing self time avoids counting nested imports twice
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return [(name, us / 1000.0) for name, us in ranked[:top]]
+
+
+def read_rss_mb():
+    """Current resident set size in MB, or None when unavailable"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS reports bytes
+        return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+    except ImportError:
+        return None
+
+
+def seed_database(path: str, rows: int = EXPORT_ROWS):
+    """Fill a reading database so /export streams real rows"""
+    from storage import ReadingStore
+    store = ReadingStore(path)
+    start = time.time() - rows
+    for i in range(rows):
+        store.add({
+            "device_id": f"ESP32_SoilSense_{i % 4:02d}", "temperature": 24.0 + i % 5,
+            "moisture": float(20 + i % 60), "n_value": 78.0, "p_value": 42.0, "k_value": 156.0,
+            "soil_type": "Loamy",
+        }, ts=start + i)
+    store.close()
+
+
+async def asgi_request(app, path: str, keep_body: bool = True):
+    """Issue a GET request directly against an ASGI app; return (status, headers, body)"""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "", "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 8000),
+    }
+    response = {"status": None, "headers": {}, "body": bytearray()}
+    requested = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Streaming responses listen for a disconnect; only send one once the body is complete
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {k.decode("latin-1"): v.decode("latin-1") for k, v in message["headers"]}
+        elif message["type"] == "http.response.body":
+            if keep_body:
+                response["body"] += message.get("body", b"")
+            if not message.get("more_body", False):
+                finished.set()
+
+    await app(scope, receive, send)
+    finished.set()
+    return response["status"], response["headers"], bytes(response["body"])
+
+
+async def asgi_get(app, path: str):
+    """Issue a GET request directly against an ASGI app and return the status code"""
+    # Dropping the body keeps the harness's own buffering out of the allocation figures
+    status, _, _ = await asgi_request(app, path, keep_body=False)
+    return status
+
+
+def profile_child():
+    """Measure startup and per-request cost inside a fresh interpreter"""
+    start = time.perf_counter()
+    import backend
+    import_ms = (time.perf_counter() - start) * 1000.0
+    rss_mb = read_rss_mb()
+    loaded = [name for name in DEFERRED_MODULES if name in sys.modules]
+
+    loop = asyncio.new_event_loop()
+    requests = {}
+    for path in ENDPOINTS:
+        # Warm up so one-off lazy initialisation is not counted per request
+        code = loop.run_until_complete(asgi_get(backend.app, path))
+        tracemalloc.start()
+        allocated = 0
+        started = time.perf_counter()
+        for _ in range(REQUESTS_PER_ENDPOINT):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            loop.run_until_complete(asgi_get(backend.app, path))
+            allocated += tracemalloc.get_traced_memory()[1] - before
+        elapsed = time.perf_counter() - started
+        tracemalloc.stop()
+        requests[path] = {
+            "status": code,
+            "peak_kb": allocated / REQUESTS_PER_ENDPOINT / 1024.0,
+            "ms": elapsed / REQUESTS_PER_ENDPOINT * 1000.0,
+        }
+    loop.close()
+
+    print(json.dumps({
+        "import_ms": import_ms,
+        "rss_mb": rss_mb,
+        "deferred_loaded": loaded,
+        "requests": requests,
+    }))
+
+
+def main():
+    """Run the profile and enforce budgets"""
+    parser = argparse.ArgumentParser(description="Zuba backend profiling harness")
+    parser.add_argument("--max-import-ms", type=float, default=1500.0,
+                        help="Budget for `import backend` wall time")
+    parser.add_argument("--max-rss-mb", type=float, default=150.0,
+                        help="Budget for resident memory after startup")
+    parser.add_argument("--max-request-kb", type=float, default=256.0,
+                        help="Budget for peak allocation per request")
+    parser.add_argument("--max-export-kb", type=float, default=512.0,
+                        help="Budget for peak allocation per streamed /export request")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        profile_child()
+        return
+
+    print("="*60)
+    print("IMPORT TIME (self time per top-level package)")
+    print("="*60)
+    for name, ms in import_time_breakdown():
+        print(f"{name:<30} {ms:>10.1f} ms")
+
+    # A throwaway database gives /export rows to stream without touching the real one
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "profile_readings.db")
+        seed_database(db_path)
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child"],
+            cwd=BACKEND_DIR, env=child_env(db_path), capture_output=True, text=True
+        )
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        sys.exit(1)
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+
+    print("\n" + "="*60)
+    print("STARTUP")
+    print("="*60)
+    print(f"import backend:  {report['import_ms']:.1f} ms")
+    rss = report["rss_mb"]
+    print(f"RSS:             {'unavailable' if rss is None else f'{rss:.1f} MB'}")
+    print(f"Heavy modules:   {', '.join(report['deferred_loaded']) or 'none loaded'}")
+
+    print("\n" + "="*60)
+    print("PER REQUEST")
+    print("="*60)
+    for path, stats in report["requests"].items():
+        print(f"{path:<36} status {stats['status']}  {stats['peak_kb']:>8.1f} KB  {stats['ms']:>7.2f} ms")
+
+    failures = []
+    if report["import_ms"] > args.max_import_ms:
+        failures.append(f"import time {report['import_ms']:.1f} ms > {args.max_import_ms} ms")
+    if rss is not None and rss > args.max_rss_mb:
+        failures.append(f"RSS {rss:.1f} MB > {args.max_rss_mb} MB")
+    if report["deferred_loaded"]:
+        failures.append(f"heavy modules imported at startup: {', '.join(report['deferred_loaded'])}")
+    for path, stats in report["requests"].items():
+        budget = args.max_export_kb if path == EXPORT_ENDPOINT else args.max_request_kb
+        if stats["peak_kb"] > budget:
+            failures.append(f"{path} allocates {stats['peak_kb']:.1f} KB > {budget} KB")
+
+    print("\n" + "="*60)
+    if failures:
+        print("BUDGET EXCEEDED")
+        for failure in failures:
+            print(f"- {failure}")
+        print("="*60)
+        sys.exit(1)
+    print("All budgets met")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
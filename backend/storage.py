@@ -0,0 +1,145 @@
+# storage.py
+"""
+SQLite storage for processed sensor readings
+
+Readings are buffered in memory and committed in batches by a background
+thread, so the serial ingest thread never waits on disk I/O. Reads open
+their own connection and page through results with fetchmany(), so callers
+can stream any time range without loading it all into memory.
+"""
+
+import atexit
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+DB_FILE = "zuba_readings.db"
+FLUSH_INTERVAL_S = 1.0
+FLUSH_BATCH_SIZE = 500
+
+COLUMNS = ("device_id", "ts", "temperature", "moisture",
+           "n_value", "p_value", "k_value", "soil_type")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    device_id   TEXT NOT NULL,
+    ts          REAL NOT NULL,
+    temperature REAL,
+    moisture    REAL,
+    n_value     REAL,
+    p_value     REAL,
+    k_value     REAL,
+    soil_type   TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_readings_device_ts ON readings (device_id, ts);
+CREATE INDEX IF NOT EXISTS idx_readings_ts ON readings (ts);
+"""
+
+
+class ReadingStore:
+    """Append-only store of processed readings with batched writes"""
+
+    def __init__(self, path: str = DB_FILE):
+        self.path = path
+        self.logger = logging.getLogger(__name__)
+        self._pending: List[Tuple] = []
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+        self._thread = threading.Thread(target=self._flush_loop, name="ReadingStoreWriter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, reading: Dict[str, Any], ts: Optional[float] = None):
+        """Queue one processed reading for the next batch"""
+        row = (
+            reading.get("device_id"),
+            time.time() if ts is None else ts,
+            reading.get("temperature"),
+            reading.get("moisture"),
+            reading.get("n_value"),
+            reading.get("p_value"),
+            reading.get("k_value"),
+            reading.get("soil_type"),
+        )
+        with self._pending_lock:
+            self._pending.append(row)
+            if len(self._pending) >= FLUSH_BATCH_SIZE:
+                self._wake.set()
+
+    def flush(self):
+        """Commit all queued readings"""
+        # Hold the write lock across the swap so a flush that finds nothing
+        # queued still waits for a batch another thread is committing
+        with self._write_lock:
+            with self._pending_lock:
+                rows, self._pending = self._pending, []
+            if not rows or self._closed:
+                return
+            try:
+                self._conn.executemany(
+                    f"INSERT INTO readings ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                    rows)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                self.logger.error("Failed to store %d readings: %s", len(rows), e)
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(FLUSH_INTERVAL_S)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Flush remaining readings and close the database"""
+        if self._closed:
+            return
+        self.flush()
+        with self._write_lock:
+            self._closed = True
+            self._conn.close()
+        self._wake.set()
+
+    def iter_chunks(self, device_id: Optional[str] = None, start: Optional[float] = None,
+                    end: Optional[float] = None, chunk_size: int = 5000) -> Iterator[List[Tuple]]:
+        """Yield stored rows in time order, chunk_size rows at a time"""
+        self.flush()
+        return iter_chunks(self.path, device_id, start, end, chunk_size)
+
+
+def iter_chunks(path: str, device_id: Optional[str] = None, start: Optional[float] = None,
+                end: Optional[float] = None, chunk_size: int = 5000) -> Iterator[List[Tuple]]:
+    """Yield rows from a reading database in time order, chunk_size rows at a time"""
+    clauses, params = [], []
+    if device_id is not None:
+        clauses.append("device_id = ?")
+        params.append(device_id)
+    if start is not None:
+        clauses.append("ts >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("ts < ?")
+        params.append(end)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    # Streaming responses may resume the generator on different worker threads
+    conn = sqlite3.connect(path, check_same_thread=False)
+    try:
+        cursor = conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM readings {where} ORDER BY ts", params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# Backend modules import each other as top-level modules (see start_server.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True, scope="session")
+def run_in_temp_dir(tmp_path_factory):
+    """Keep logs, databases and alert files written by the processor out of the tree"""
+    previous = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("run"))
+    yield
+    os.chdir(previous)
@@ -0,0 +1,177 @@
+import random
+import time
+
+import pytest
+
+from alerts import (DEFAULT_THRESHOLDS, AlertDispatcher, AlertEngine, Notifier, QueueNotifier,
+                    classify_moisture)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for the dispatcher"
+        time.sleep(0.01)
+
+
+def feed(engine, values, start=0.0, step=1.0, device_id="d1", soil_type="Loamy"):
+    events = []
+    for i, moisture in enumerate(values):
+        event = engine.update(device_id, soil_type, moisture, now=start + i * step)
+        if event:
+            events.append(event)
+    return events
+
+
+@pytest.mark.parametrize("start", [31.0, 29.0])
+def test_sensor_hovering_at_threshold_is_not_reevaluated(start):
+    engine = AlertEngine()
+    rng = random.Random(1)
+    values = [start] + [30.0 + rng.uniform(-1.0, 1.0) for _ in range(3599)]
+    events = feed(engine, values)
+
+    assert len(events) == (0 if start > 30 else 1)
+    assert engine.evaluations == 1
+    assert engine.skipped == 3599
+
+
+def test_worsening_needs_hysteresis_and_debounce():
+    engine = AlertEngine(hysteresis=2.0, debounce_s=60.0)
+    feed(engine, [40.0])
+    # Just under the threshold, within the hysteresis margin: no change
+    assert feed(engine, [29.0] * 120, start=1) == []
+    # Well past the threshold: reported once the level has held for 60 s
+    events = feed(engine, [25.0] * 120, start=200)
+    assert [(e["previous"], e["level"]) for e in events] == [("ok", "irrigate")]
+    assert events[0]["timestamp"]
+    assert engine.level_of("d1") == "irrigate"
+
+
+def test_short_excursion_is_debounced():
+    engine = AlertEngine(debounce_s=60.0)
+    feed(engine, [40.0])
+    assert feed(engine, [15.0] * 30, start=1) == []
+    assert feed(engine, [40.0] * 10, start=31) == []
+    assert engine.level_of("d1") == "ok"
+
+
+def test_recovery_must_clear_threshold_by_hysteresis():
+    engine = AlertEngine(hysteresis=2.0, debounce_s=0.0)
+    feed(engine, [10.0])
+    assert engine.level_of("d1") == "critical"
+    assert feed(engine, [21.0], start=1) == []
+    events = feed(engine, [23.0], start=2)
+    assert [(e["previous"], e["level"]) for e in events] == [("critical", "irrigate")]
+
+
+def test_per_device_thresholds():
+    engine = AlertEngine(debounce_s=0.0)
+    engine.set_thresholds("d2", {"critical": 25.0, "irrigate": 40.0})
+    feed(engine, [45.0], device_id="d2")
+    events = feed(engine, [35.0], start=1, device_id="d2")
+    assert [e["level"] for e in events] == ["irrigate"]
+    assert classify_moisture("Loamy", 30.0, engine.thresholds_for("d1")) == "ok"
+
+
+def test_recommended_override_keeps_other_soil_types():
+    engine = AlertEngine()
+    engine.set_thresholds("d1", {"recommended": {"Sandy": 40.0, "Loamy": 35.0}})
+    recommended = engine.thresholds_for("d1")["recommended"]
+    assert recommended == {"Sandy": 40.0, "Silty": 50.0, "Clayey": 60.0, "Loamy": 35.0}
+    assert DEFAULT_THRESHOLDS["recommended"] == {"Sandy": 50.0, "Silty": 50.0, "Clayey": 60.0}
+    assert classify_moisture("Clayey", 55.0, engine.thresholds_for("d1")) == "recommended"
+
+
+def test_events_go_to_dispatcher_and_close_drains_queue():
+    notifier = QueueNotifier()
+    dispatcher = AlertDispatcher(notifier, batch_interval_s=60.0)
+    engine = AlertEngine(dispatcher, debounce_s=0.0)
+    feed(engine, [10.0], device_id="a")
+    feed(engine, [10.0], device_id="b")
+    dispatcher.close()
+
+    delivered = [e["device_id"] for batch in list(notifier.queue.queue) for e in batch]
+    assert delivered == ["a", "b"]
+    assert dispatcher.delivered == 2
+
+
+def test_failed_delivery_is_retried():
+    class FlakyNotifier(Notifier):
+        def __init__(self):
+            self.calls = 0
+
+        def send(self, events):
+            self.calls += 1
+            if self.calls < 3:
+                raise OSError("webhook down")
+
+    notifier = FlakyNotifier()
+    dispatcher = AlertDispatcher(notifier, batch_interval_s=0.0, retry_backoff_s=0.01)
+    dispatcher.submit({"device_id": "a"})
+    wait_for(lambda: dispatcher.delivered)
+    dispatcher.close()
+    assert notifier.calls == 3
+    assert dispatcher.delivered == 1
+    assert dispatcher.dropped == 0
+
+
+def test_close_cuts_backoff_short_and_tries_queued_batches_once():
+    class DownNotifier(Notifier):
+        def __init__(self):
+            self.calls = 0
+
+        def send(self, events):
+            self.calls += 1
+            raise OSError("webhook down")
+
+    notifier = DownNotifier()
+    dispatcher = AlertDispatcher(notifier, batch_size=1, batch_interval_s=0.0, retry_backoff_s=60.0)
+    dispatcher.submit({"device_id": "a"})
+    dispatcher.submit({"device_id": "b"})
+    wait_for(lambda: notifier.calls)
+
+    started = time.monotonic()
+    dispatcher.close()
+    assert time.monotonic() - started < 5.0
+    assert not dispatcher._thread.is_alive()
+    assert notifier.calls == 2
+    assert dispatcher.dropped == 2
+
+
+def test_submit_after_close_is_counted_as_dropped():
+    notifier = QueueNotifier()
+    dispatcher = AlertDispatcher(notifier)
+    dispatcher.close()
+    dispatcher.submit({"device_id": "a"})
+    assert dispatcher.dropped == 1
+    assert dispatcher._queue.empty()
+    assert notifier.queue.empty()
+
+
+def test_notifier_is_abstract():
+    with pytest.raises(TypeError):
+        Notifier()
+
+
+def test_processor_recommendation_and_fleet_use_debounced_device_level():
+    pytest.importorskip("numpy")
+    from process import ZubaGSMProcessor
+
+    processor = ZubaGSMProcessor(db_path=None, alert_notifier=QueueNotifier())
+    processor.show_output = False
+    processor.alerts.set_thresholds("d1", {"irrigate": 45.0})
+
+    def frame(moisture, now):
+        return processor.process_sensor_data({
+            "device_id": "d1", "temperature": 22, "moisture": moisture,
+            "n_value": 40, "p_value": 25, "k_value": 30,
+        }, now)
+
+    first = frame(40.0, 0.0)
+    assert "IRRIGATE NOW" in first["recommendation"]
+    assert processor.fleet.page(alert="irrigate", now=0.0)["total"] == 1
+
+    # A brief recovery is still inside the debounce window
+    brief = frame(60.0, 10.0)
+    assert "IRRIGATE NOW" in brief["recommendation"]
+    assert processor.fleet.page(alert="irrigate", now=10.0)["total"] == 1
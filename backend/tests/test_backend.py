@@ -0,0 +1,115 @@
+import asyncio
+import csv
+import io
+import json
+from urllib.parse import urlencode
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from profile_backend import asgi_request
+from storage import ReadingStore
+
+BASE_TS = 1_700_000_000.0
+
+
+@pytest.fixture(scope="module")
+def backend():
+    """Import the app without a serial thread, database or real alert notifier"""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("ZUBA_DISABLE_SERIAL", "1")
+        mp.setenv("ZUBA_DRY_RUN", "1")
+        mp.delenv("ZUBA_DB_FILE", raising=False)
+        import backend
+    return backend
+
+
+def get(backend, path, **params):
+    if params:
+        path = f"{path}?{urlencode(params)}"
+    return asyncio.run(asgi_request(backend.app, path))
+
+
+@pytest.fixture
+def store(backend, tmp_path, monkeypatch):
+    store = ReadingStore(str(tmp_path / "readings.db"))
+    for i in range(300):
+        store.add({
+            "device_id": f"d{i % 3}", "temperature": 22.0, "moisture": float(i % 100),
+            "n_value": 40.0, "p_value": 25.0, "k_value": 30.0, "soil_type": "Loamy",
+        }, ts=BASE_TS + i)
+    monkeypatch.setattr(backend.processor, "store", store)
+    yield store
+    store.close()
+
+
+def test_export_is_404_without_storage(backend, monkeypatch):
+    monkeypatch.setattr(backend.processor, "store", None)
+    status, _, _ = get(backend, "/export", format="csv")
+    assert status == 404
+
+
+def test_export_streams_filtered_csv(backend, store):
+    status, headers, body = get(backend, "/export", format="csv", device_id="d1",
+                                start="2023-11-14T22:15:00", chunk_size=100)
+    assert status == 200
+    assert headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(body.decode("utf-8"))))
+    # 2023-11-14T22:15:00 UTC is BASE_TS + 100, whatever the server's timezone
+    assert len(rows) == 67
+    assert {row["device_id"] for row in rows} == {"d1"}
+    assert rows[0]["timestamp"] == "2023-11-14T22:15:00+00:00"
+
+
+@pytest.mark.parametrize("params", [
+    {"format": "xml"},
+    {"format": "csv", "start": "nan"},
+    {"format": "csv", "end": "inf"},
+    {"format": "csv", "start": "yesterday"},
+])
+def test_export_rejects_bad_parameters_with_400(backend, store, params):
+    status, _, body = get(backend, "/export", **params)
+    assert status == 400, body
+
+
+def test_export_filename_is_sanitized(backend, store):
+    status, headers, _ = get(backend, "/export", format="csv", device_id='x"; evil\r\n../é')
+    assert status == 200
+    assert headers["content-disposition"] == 'attachment; filename="zuba_x___evil__..__.csv"'
+
+
+@pytest.fixture
+def fleet(backend, monkeypatch):
+    from fleet import FleetState
+    fleet = FleetState()
+    for i in range(30):
+        fleet.update(f"d{i:02d}", 15.0 if i % 3 == 0 else 50.0, "critical" if i % 3 == 0 else "ok")
+    monkeypatch.setattr(backend.processor, "fleet", fleet)
+    return fleet
+
+
+def test_fleet_pages_one_alert_level(backend, fleet):
+    status, _, body = get(backend, "/fleet", alert="critical", offset=2, limit=3)
+    assert status == 200
+    page = json.loads(body)
+    assert page["total"] == 10
+    assert page["counts"] == {"critical": 10, "irrigate": 0, "recommended": 0, "ok": 20}
+    assert [d["device_id"] for d in page["devices"]] == ["d06", "d09", "d12"]
+
+
+def test_fleet_rejects_unknown_alert_with_400(backend, fleet):
+    status, _, body = get(backend, "/fleet", alert="panic")
+    assert status == 400
+    assert "panic" in json.loads(body)["detail"]
+
+
+@pytest.mark.parametrize("params", [
+    {"limit": 0},
+    {"limit": 1001},
+    {"offset": -1},
+    {"stale_after": 0},
+])
+def test_fleet_enforces_query_bounds(backend, fleet, params):
+    status, _, _ = get(backend, "/fleet", **params)
+    assert status == 422
@@ -0,0 +1,94 @@
+import gzip
+
+import pytest
+
+from capture import CAPTURE_HEADER, SerialRecorder, read_capture, replay_capture
+
+
+class RecordingProcessor:
+    def __init__(self):
+        self.calls = []
+
+    def process_line(self, line, now=None):
+        self.calls.append((line, now))
+        return line.startswith('{')
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "capture.zcap.gz")
+    recorder = SerialRecorder(path)
+    recorder.write('{"moisture": 30}')
+    recorder.write("ESP32 booting\twith tab")
+    recorder.close()
+
+    lines = [line for _, line in read_capture(path)]
+    assert lines == ['{"moisture": 30}', "ESP32 booting with tab"]
+
+
+def test_flushed_lines_survive_without_close(tmp_path):
+    path = str(tmp_path / "capture.zcap.gz")
+    recorder = SerialRecorder(path)
+    for i in range(250):
+        recorder.write(f'{{"moisture": {i}}}')
+    # Simulate a crash: read the file while the recorder is still open
+    assert len(list(read_capture(path))) >= 200
+    recorder.close()
+
+
+def test_truncated_capture_stops_cleanly(tmp_path):
+    path = tmp_path / "capture.zcap.gz"
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write(CAPTURE_HEADER + "\n")
+        for i in range(2000):
+            f.write(f"{i * 0.1:.6f}\t{{\"moisture\": {i}}}\n")
+    data = path.read_bytes()
+    path.write_bytes(data[:len(data) // 2])
+
+    offsets = [offset for offset, _ in read_capture(str(path))]
+    assert 0 < len(offsets) < 2000
+    assert offsets == sorted(offsets)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.gz"
+    with gzip.open(path, 'wt') as f:
+        f.write("hello\n")
+    with pytest.raises(ValueError):
+        list(read_capture(str(path)))
+
+
+def test_replay_at_max_speed(tmp_path):
+    path = str(tmp_path / "capture.zcap.gz")
+    recorder = SerialRecorder(path)
+    recorder.write('{"moisture": 30}')
+    recorder.write("ESP32 ready")
+    recorder.close()
+
+    processor = RecordingProcessor()
+    stats = replay_capture(processor, path, None)
+    assert stats["lines"] == 2
+    assert stats["frames_processed"] == 1
+
+
+def test_replay_uses_capture_time_not_wall_clock(tmp_path):
+    pytest.importorskip("numpy")
+    from alerts import QueueNotifier
+    from process import ZubaGSMProcessor
+
+    path = tmp_path / "capture.zcap.gz"
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write(CAPTURE_HEADER + "\n")
+        for i in range(300):
+            moisture = 40 - i * 0.1
+            f.write(f"{i * 10.0:.6f}\t{{\"temperature\": 22, \"moisture\": {moisture:.1f}, "
+                    f"\"n_value\": 40, \"p_value\": 25, \"k_value\": 30}}\n")
+
+    processor = ZubaGSMProcessor(db_path=None, alert_notifier=QueueNotifier())
+    processor.show_output = False
+    replay_capture(processor, str(path), None, base_time=1_700_000_000.0)
+
+    features = processor.last_sensor_read["features"]
+    # 0.1 % every 10 s = 36 %/hour, whatever the replay speed
+    assert features["moisture_slope"] == pytest.approx(-36.0, rel=1e-3)
+    assert features["drainage_rate"] == pytest.approx(36.0, rel=1e-3)
+    assert processor.alerts.level_of("ESP32_SoilSense_01") == "critical"
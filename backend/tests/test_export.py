@@ -0,0 +1,104 @@
+import csv
+import io
+import time
+from datetime import datetime
+
+import pytest
+
+from export import _ChunkSink, export_stream, parse_time, resolve_format
+from storage import ReadingStore
+
+BASE_TS = 1_700_000_000.0
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ReadingStore(str(tmp_path / "readings.db"))
+    for i in range(2500):
+        store.add({
+            "device_id": f"d{i % 2}", "temperature": 20.0 + i % 5, "moisture": float(i % 100),
+            "n_value": 40.0, "p_value": 25.0, "k_value": 30.0, "soil_type": "Loamy",
+        }, ts=BASE_TS + i)
+    yield store
+    store.close()
+
+
+def export_bytes(store, fmt, **filters):
+    chunks = store.iter_chunks(chunk_size=500, **filters)
+    return b"".join(export_stream(chunks, fmt))
+
+
+def test_csv_round_trip_uses_utc(store):
+    data = export_bytes(store, "csv", device_id="d1", start=BASE_TS + 100)
+    rows = list(csv.DictReader(io.StringIO(data.decode("utf-8"))))
+    assert len(rows) == 1200
+    assert rows[0]["device_id"] == "d1"
+    first = datetime.fromisoformat(rows[0]["timestamp"])
+    assert first.utcoffset().total_seconds() == 0
+    assert first.timestamp() == BASE_TS + 101
+    assert float(rows[0]["moisture"]) == 1.0
+
+
+def test_arrow_round_trip(store):
+    pa = pytest.importorskip("pyarrow")
+    table = pa.ipc.open_stream(export_bytes(store, "arrow", device_id="d0")).read_all()
+    assert table.num_rows == 1250
+    assert table.column("timestamp")[0].as_py().timestamp() == BASE_TS
+    assert table.column("moisture").to_pylist()[:3] == [0.0, 2.0, 4.0]
+
+
+def test_parquet_round_trip_writes_row_group_per_chunk(store):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    data = export_bytes(store, "parquet", end=BASE_TS + 2000)
+    assert pq.read_metadata(pa.BufferReader(data)).num_row_groups == 4
+    table = pq.read_table(pa.BufferReader(data))
+    assert table.num_rows == 2000
+    assert table.column("device_id").to_pylist()[:2] == ["d0", "d1"]
+
+
+def test_formats_agree_on_timestamps(store):
+    pa = pytest.importorskip("pyarrow")
+    csv_rows = list(csv.DictReader(io.StringIO(export_bytes(store, "csv", end=BASE_TS + 3).decode())))
+    arrow = pa.ipc.open_stream(export_bytes(store, "arrow", end=BASE_TS + 3)).read_all()
+    assert [datetime.fromisoformat(r["timestamp"]) for r in csv_rows] == arrow.column("timestamp").to_pylist()
+
+
+def test_chunk_sink_drains_between_batches():
+    sink = _ChunkSink()
+    sink.write(b"abc")
+    assert sink.drain() == b"abc"
+    sink.write(b"d")
+    assert sink.tell() == 4
+    assert sink.drain() == b"d"
+
+
+def test_resolve_format_and_parse_time():
+    assert resolve_format("CSV") == "csv"
+    with pytest.raises(ValueError):
+        resolve_format("xml")
+    assert parse_time("1700000000") == BASE_TS
+    assert parse_time(None) is None
+
+
+@pytest.fixture
+def new_york_tz(monkeypatch):
+    if not hasattr(time, "tzset"):
+        pytest.skip("time.tzset is not available on this platform")
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_parse_time_reads_naive_input_as_utc(new_york_tz):
+    assert parse_time("2025-09-01") == 1756684800.0
+    assert parse_time("2025-09-01T12:00:00") == 1756684800.0 + 12 * 3600
+    assert parse_time("2025-09-01T00:00:00-04:00") == 1756684800.0 + 4 * 3600
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-inf", "not a time"])
+def test_parse_time_rejects_invalid_input(value):
+    with pytest.raises(ValueError):
+        parse_time(value)
@@ -0,0 +1,70 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from features import DEFAULT_DRAINAGE_INDEX, DeviceFeatures, FeatureEngine
+
+
+def reading(moisture, temperature=22.0, n_value=40.0):
+    return {"moisture": moisture, "temperature": temperature,
+            "n_value": n_value, "p_value": 25, "k_value": 30}
+
+
+def test_drainage_unknown_until_drydown_observed():
+    device = DeviceFeatures()
+    for i in range(3):
+        snapshot = device.update(reading(60 - i * 0.5), now=i * 600.0)
+    # Only 20 minutes of drydown so far
+    assert snapshot["drainage_rate"] is None
+    assert device.drainage_index() == DEFAULT_DRAINAGE_INDEX
+
+
+def test_drydown_drainage_rate():
+    device = DeviceFeatures()
+    # 0.5 % every 10 minutes = 3 %/hour
+    for i in range(10):
+        snapshot = device.update(reading(60 - i * 0.5), now=i * 600.0)
+    assert snapshot["drainage_rate"] == pytest.approx(3.0)
+    assert device.drainage_index() == 1.0
+
+
+def test_watering_resets_drydown_peak():
+    device = DeviceFeatures()
+    for i in range(6):
+        device.update(reading(60 - i), now=i * 600.0)
+    rate_before = device.drainage_rate
+    # Irrigation: moisture jumps back up, new drydown starts from the new peak
+    device.update(reading(70), now=6 * 600.0)
+    device.update(reading(69.5), now=7 * 600.0)
+    assert device.drainage_rate == rate_before
+
+
+def test_ring_buffer_wraps_at_fixed_size():
+    device = DeviceFeatures(window=8)
+    for i in range(20):
+        snapshot = device.update(reading(50 - i, n_value=40 + i), now=i * 3600.0)
+    assert snapshot["samples"] == 8
+    assert device._times.shape == (8,)
+    # Slope is computed over the 8 newest readings only
+    assert snapshot["moisture_slope"] == pytest.approx(-1.0)
+    assert snapshot["n_trend"] == pytest.approx(1.0)
+    assert sorted(device._times) == [i * 3600.0 for i in range(12, 20)]
+
+
+def test_growing_degree_days_skip_long_gaps():
+    device = DeviceFeatures()
+    device.update(reading(50, temperature=20), now=0.0)
+    device.update(reading(50, temperature=20), now=3600.0)
+    # 1 hour at 10 °C above base
+    assert device.gdd == pytest.approx(10 / 24)
+    device.update(reading(50, temperature=20), now=3600.0 * 5)
+    assert device.gdd == pytest.approx(10 / 24)
+
+
+def test_engine_tracks_devices_independently():
+    engine = FeatureEngine()
+    engine.update("a", reading(50), now=0.0)
+    engine.update("b", reading(10), now=0.0)
+    assert len(engine) == 2
+    assert engine.get("a").snapshot["samples"] == 1
+    assert engine.get("missing") is None
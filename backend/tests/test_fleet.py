@@ -0,0 +1,43 @@
+import pytest
+
+from fleet import FleetState
+
+
+def test_level_change_moves_device_between_indexes():
+    fleet = FleetState()
+    fleet.update("d1", 50, "ok", now=0)
+    fleet.update("d2", 15, "critical", now=0)
+    assert fleet.counts() == {"critical": 1, "irrigate": 0, "recommended": 0, "ok": 1}
+
+    fleet.update("d1", 25, "irrigate", now=10)
+    assert fleet.counts() == {"critical": 1, "irrigate": 1, "recommended": 0, "ok": 0}
+    assert [d["device_id"] for d in fleet.page(alert="irrigate", now=10)["devices"]] == ["d1"]
+    assert fleet.page(alert="ok", now=10)["devices"] == []
+
+    # Same level again does not duplicate the index entry
+    fleet.update("d1", 24, "irrigate", now=20)
+    assert fleet.page(alert="irrigate", now=20)["total"] == 1
+    assert len(fleet) == 2
+
+
+def test_pagination_is_sorted_by_device_id():
+    fleet = FleetState()
+    for i in reversed(range(25)):
+        fleet.update(f"d{i:02d}", 50, "ok", now=0)
+    page = fleet.page(offset=10, limit=5, now=0)
+    assert page["total"] == 25
+    assert [d["device_id"] for d in page["devices"]] == [f"d{i:02d}" for i in range(10, 15)]
+
+
+def test_staleness_is_computed_at_request_time():
+    fleet = FleetState()
+    fleet.update("d1", 50, "ok", now=1000)
+    row = fleet.page(stale_after=300, now=1200)["devices"][0]
+    assert row["age_s"] == 200
+    assert not row["stale"]
+    assert fleet.page(stale_after=300, now=1400)["devices"][0]["stale"]
+
+
+def test_unknown_alert_level_is_rejected():
+    with pytest.raises(ValueError):
+        FleetState().page(alert="panic")
@@ -0,0 +1,63 @@
+import json
+import logging
+import os
+import queue
+import time
+
+from log_setup import DroppingQueueHandler, JsonFormatter, SamplingFilter, SizeAndTimeRotatingFileHandler
+
+
+def make_record(msg, *args, level=logging.INFO, exc_info=None):
+    return logging.LogRecord("test", level, __file__, 1, msg, args, exc_info)
+
+
+def test_prepared_record_keeps_type_and_traceback():
+    handler = DroppingQueueHandler(queue.Queue())
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        import sys
+        record = make_record("Processing error: %s", "boom", level=logging.ERROR, exc_info=sys.exc_info())
+
+    prepared = handler.prepare(record)
+    entry = json.loads(JsonFormatter().format(prepared))
+    assert entry["type"] == "Processing error: %s"
+    assert entry["msg"] == "Processing error: boom"
+    assert "ZeroDivisionError" in entry["exc"]
+    assert "Traceback" not in entry["msg"]
+
+
+def test_sampling_filter_keeps_one_in_n_and_all_warnings():
+    sampler = SamplingFilter({"Raw JSON: %s": 10})
+    kept = sum(sampler.filter(make_record("Raw JSON: %s", i)) for i in range(100))
+    assert kept == 10
+    assert all(sampler.filter(make_record("Raw JSON: %s", i, level=logging.WARNING)) for i in range(5))
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    handler.emit(make_record("one"))
+    handler.emit(make_record("two"))
+    assert handler.dropped == 1
+
+
+def test_age_rotation_uses_creation_time_not_mtime(tmp_path):
+    path = str(tmp_path / "zuba.log")
+    handler = SizeAndTimeRotatingFileHandler(path, 10 ** 6, 60, 2)
+    handler.setFormatter(JsonFormatter())
+    handler.emit(make_record("first"))
+    handler.close()
+
+    # Pretend the file was created two minutes ago and written to just now
+    with open(path + ".created", "w") as f:
+        f.write(f"{time.time() - 120}\n")
+    os.utime(path)
+
+    handler = SizeAndTimeRotatingFileHandler(path, 10 ** 6, 60, 2)
+    handler.setFormatter(JsonFormatter())
+    handler.emit(make_record("second"))
+    handler.close()
+
+    assert os.path.exists(path + ".1")
+    with open(path) as f:
+        assert [json.loads(line)["msg"] for line in f] == ["second"]